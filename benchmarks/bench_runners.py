@@ -0,0 +1,355 @@
+"""Scheduler-overhead benchmarks of the runners.
+
+Every benchmark runs a no-op (or sleep) workload, so the measured time is the
+overhead of the runner itself. Remote backends are replaced by local stand-ins:
+`MultiMachineRunner' talks to fake hosts whose ssh clients execute the commands on
+this machine, and `IBMRunner' submits to fake `bsub' and `bjobs' executables.
+
+For each configuration it reports the throughput (commands per second), the
+percentiles of the dispatch latency (time from the call to `run' until a command
+starts), the CPU time of the scheduler process, and its peak Python memory.
+
+Usage
+-----
+    python benchmarks/bench_runners.py --runners single multi ibm --save base.json
+    python benchmarks/bench_runners.py --compare base.json --tolerance 0.2
+"""
+import argparse
+import io
+import itertools
+import json
+import os
+import resource
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lsf_runner import get_backend  # noqa: E402
+
+FAKE_BSUB = """#!/usr/bin/env bash
+# Fake bsub: record the submission and run the job command in the background.
+echo "$(date +%s.%N)" >> "{log}"
+sh -c "${{@: -1}}" > /dev/null 2>&1 &
+"""
+
+FAKE_BJOBS = """#!/usr/bin/env bash
+# Fake bjobs: there are never pending jobs.
+exit 0
+"""
+
+
+class LocalChannel(object):
+    """Channel of a process started by `LocalSSHClient'.
+
+    As with sshd, the channel reaches EOF only when no process, including jobs the
+    command left in the background, holds its output.
+    """
+
+    closed = False
+
+    def __init__(self, process=None):
+        self.process = process
+        if process is not None:
+            os.set_blocking(process.stdout.fileno(), False)
+
+    @property
+    def eof_received(self):
+        if self.process is None:
+            return True
+        try:
+            while os.read(self.process.stdout.fileno(), 4096):
+                pass
+        except BlockingIOError:
+            return False
+        return True
+
+    def exit_status_ready(self):
+        return self.process is None or self.process.poll() is not None
+
+    def recv_exit_status(self):
+        return 0 if self.process is None else self.process.wait()
+
+
+class LocalStdout(io.StringIO):
+    """Stdout of `LocalSSHClient.exec_command', with the channel attribute."""
+
+    def __init__(self, value, channel):
+        super().__init__(value)
+        self.channel = channel
+
+
+class LocalTransport(object):
+    """Transport that is always healthy."""
+
+    def is_active(self):
+        return True
+
+    def send_ignore(self):
+        pass
+
+    def set_keepalive(self, interval):
+        pass
+
+
+class LocalSSHClient(object):
+    """Stand-in for `paramiko.SSHClient' that runs commands on this machine.
+
+    The free-CPU query is answered with `free_cpu' so that every fake host looks
+    like an idle machine of that size.
+    """
+
+    free_cpu = 64
+
+    def __init__(self):
+        self.transport = None
+
+    def load_system_host_keys(self):
+        pass
+
+    def connect(self, hostname, username, password, timeout):
+        self.transport = LocalTransport()
+
+    def get_transport(self):
+        return self.transport
+
+    def exec_command(self, command, timeout=None):
+        if command == "python get_free_cpu_count.py":
+            return None, LocalStdout(f"{self.free_cpu}\n", LocalChannel()), None
+        process = subprocess.Popen(
+            command,
+            shell=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        return None, LocalStdout("", LocalChannel(process)), None
+
+    def close(self):
+        self.transport = None
+
+
+def workload(stamp_dir: str, num_tasks: int, sleep: float) -> List[str]:
+    """Return commands that record their start time and sleep."""
+    return [
+        f"date +%s.%N > {stamp_dir}/{i}; sleep {sleep}" for i in range(num_tasks)
+    ]
+
+
+def read_stamps(stamp_dir: str, num_tasks: int, timeout: float) -> List[float]:
+    """Wait for the start times written by the workload and return them."""
+    deadline = time.time() + timeout
+    stamps = {}  # type: Dict[str, float]
+    while len(stamps) < num_tasks and time.time() < deadline:
+        for name in os.listdir(stamp_dir):
+            if name in stamps:
+                continue
+            with open(os.path.join(stamp_dir, name)) as f:
+                content = f.read().strip()
+            if content:
+                stamps[name] = float(content)
+        time.sleep(0.01)
+    return sorted(stamps.values())
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Return the q-th percentile, with linear interpolation."""
+    if not values:
+        return float("nan")
+    position = (len(values) - 1) * q / 100
+    low, high = int(position), min(int(position) + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def make_runner(backend: str, num_workers: int, num_hosts: int):
+    """Build a runner of `backend' wired to the local stand-ins."""
+    if backend == "single":
+        return get_backend("SingleRunner")("bench", num_workers=num_workers)
+    elif backend == "multi":
+        from lsf_runner.ssh_pool import SSHConnectionPool
+
+        hosts = [f"host{i}" for i in range(num_hosts)]
+        pool = SSHConnectionPool("", "", client_factory=LocalSSHClient)
+        return get_backend("MultiMachineRunner")(
+            "bench", username="", password="", cluster_list=hosts, pool=pool
+        )
+    elif backend == "ibm":
+        return get_backend("IBMRunner")("bench")
+    raise ValueError(f"Unknown backend {backend}.")
+
+
+def install_fake_lsf(bin_dir: str, log: str) -> None:
+    """Write fake bsub and bjobs executables to `bin_dir' and put it in PATH."""
+    for name, content in [("bsub", FAKE_BSUB.format(log=log)), ("bjobs", FAKE_BJOBS)]:
+        path = os.path.join(bin_dir, name)
+        with open(path, "w") as f:
+            f.write(content)
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ["PATH"]
+
+
+def run_once(
+    backend: str,
+    num_tasks: int,
+    num_workers: int,
+    num_hosts: int,
+    sleep: float,
+    trace_memory: bool = False,
+) -> Dict[str, Any]:
+    """Run a configuration once, in a scratch directory.
+
+    Python memory is traced only if `trace_memory', as tracing slows down the run.
+    """
+    tmp_dir = tempfile.mkdtemp(prefix="lsf_runner_bench_")
+    cwd = os.getcwd()
+    path = os.environ["PATH"]
+    peak_memory = 0
+    try:
+        os.chdir(tmp_dir)  # IBMRunner writes its logs to the working directory.
+        stamp_dir = os.path.join(tmp_dir, "stamps")
+        os.makedirs(stamp_dir)
+        if backend == "ibm":
+            install_fake_lsf(tmp_dir, os.path.join(tmp_dir, "bsub.log"))
+        runner = make_runner(backend, num_workers, num_hosts)
+        cmd_list = workload(stamp_dir, num_tasks, sleep)
+
+        if trace_memory:
+            tracemalloc.start()
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        start = time.time()
+        runner.run(cmd_list)
+        dispatch_time = time.time() - start
+        new_usage = resource.getrusage(resource.RUSAGE_SELF)
+        if trace_memory:
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        stamps = read_stamps(stamp_dir, num_tasks, timeout=30 + num_tasks * sleep)
+        if hasattr(runner, "close"):
+            runner.close()
+    finally:
+        os.chdir(cwd)
+        os.environ["PATH"] = path
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    cpu_time = (new_usage.ru_utime - usage.ru_utime) + (
+        new_usage.ru_stime - usage.ru_stime
+    )
+    return dict(
+        dispatch_time=dispatch_time,
+        latencies=[stamp - start for stamp in stamps],
+        scheduler_cpu=cpu_time,
+        peak_memory=peak_memory,
+        max_rss_kb=new_usage.ru_maxrss,
+    )
+
+
+def bench(
+    backend: str, num_tasks: int, num_workers: int, num_hosts: int, sleep: float
+) -> Dict[str, Any]:
+    """Run one benchmark configuration and return its metrics.
+
+    Throughput, latency and CPU come from a timed pass, and the peak Python memory
+    from a second pass with `tracemalloc' enabled.
+    """
+    timed = run_once(backend, num_tasks, num_workers, num_hosts, sleep)
+    traced = run_once(
+        backend, num_tasks, num_workers, num_hosts, sleep, trace_memory=True
+    )
+    latencies = timed["latencies"]
+    return dict(
+        backend=backend,
+        num_tasks=num_tasks,
+        num_workers=num_workers,
+        num_hosts=num_hosts,
+        started=len(latencies),
+        dispatch_time=timed["dispatch_time"],
+        throughput=num_tasks / timed["dispatch_time"],
+        latency_p50=percentile(latencies, 50),
+        latency_p90=percentile(latencies, 90),
+        latency_p99=percentile(latencies, 99),
+        scheduler_cpu=timed["scheduler_cpu"],
+        peak_memory_kb=traced["peak_memory"] / 1024,
+        max_rss_kb=timed["max_rss_kb"],
+    )
+
+
+def key(result: Dict[str, Any]) -> str:
+    """Return the identifier of a configuration."""
+    return "{backend}-t{num_tasks}-w{num_workers}-h{num_hosts}".format(**result)
+
+
+def compare(
+    results: List[Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tol: float
+) -> List[str]:
+    """Return the configurations whose throughput regressed more than `tol'."""
+    regressions = []
+    for result in results:
+        base = baseline.get(key(result))
+        if base is None:
+            continue
+        ratio = result["throughput"] / base["throughput"]
+        print(f"{key(result)}: {ratio:.2f}x baseline throughput")
+        if ratio < 1 - tol:
+            regressions.append(key(result))
+    return regressions
+
+
+def main(args: argparse.Namespace) -> int:
+    """Run all configurations, print them, and save or compare baselines."""
+    results = []
+    for backend in args.runners:
+        workers = args.num_workers if backend == "single" else [1]
+        hosts = args.num_hosts if backend == "multi" else [1]
+        for num_tasks, num_workers, num_hosts in itertools.product(
+            args.num_tasks, workers, hosts
+        ):
+            result = bench(backend, num_tasks, num_workers, num_hosts, args.sleep)
+            results.append(result)
+            print(
+                "{:<22} {:>8.1f} cmd/s  p50 {:>6.3f}s  p99 {:>6.3f}s  "
+                "cpu {:>6.3f}s  mem {:>8.0f}KB".format(
+                    key(result),
+                    result["throughput"],
+                    result["latency_p50"],
+                    result["latency_p99"],
+                    result["scheduler_cpu"],
+                    result["peak_memory_kb"],
+                )
+            )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({key(r): r for r in results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Throughput regressions: {regressions}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--runners",
+        nargs="+",
+        default=["single", "multi", "ibm"],
+        choices=["single", "multi", "ibm"],
+    )
+    parser.add_argument("--num-tasks", nargs="+", type=int, default=[8, 32])
+    parser.add_argument("--num-workers", nargs="+", type=int, default=[1, 2])
+    parser.add_argument("--num-hosts", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--sleep", type=float, default=0.0)
+    parser.add_argument("--save", type=str, default=None)
+    parser.add_argument("--compare", type=str, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    sys.exit(main(parser.parse_args()))
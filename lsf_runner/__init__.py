@@ -1,9 +1,18 @@
-from .ibm_runner import IBMRunner
-from .multi_machine_runner import MultiMachineRunner
-from .single_machine_runner import SingleRunner
+from .backends import get_backend, list_backends, register_backend
+from .planner import load_runtimes
 from .util import is_ibm, make_commands
 
 
+def __getattr__(name):
+    """Lazily import the runner classes, see `lsf_runner.backends'."""
+    if not name.startswith("_"):
+        try:
+            return get_backend(name)
+        except KeyError:
+            pass
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def init_runner(
     name,
     num_threads=1,
@@ -17,6 +26,8 @@ def init_runner(
     conda_env=None,
     run_dir=None,
     result_dir=None,
+    overflow=False,
+    max_queue_depth=100,
 ):
     """Initialize the runner.
 
@@ -46,6 +57,12 @@ def init_runner(
         Name of running directory in cluster.
     result_dir: str.
         Directory where results are stored in cluster.
+    overflow: bool, optional. (default=False).
+        If True, spread the commands over all available backends (LSF, cluster list
+        and this machine) with a `HybridRunner'.
+    max_queue_depth: int, optional. (default=100).
+        Number of pending LSF jobs at which the LSF backend stops taking commands
+        when `overflow' is set.
 
     Returns
     -------
@@ -53,19 +70,23 @@ def init_runner(
         An initialized runner.
 
     """
+    runners = []
     if is_ibm():
-        return IBMRunner(
-            name,
-            num_threads=num_threads,
-            use_gpu=use_gpu,
-            wall_time=wall_time,
-            memory=memory,
+        runners.append(
+            get_backend("IBMRunner")(
+                name,
+                num_threads=num_threads,
+                use_gpu=use_gpu,
+                wall_time=wall_time,
+                memory=memory,
+            )
         )
-    else:
-        if cluster_list is None:
-            return SingleRunner(name, num_threads=num_threads, num_workers=num_workers)
-        else:
-            return MultiMachineRunner(
+        if not overflow:
+            return runners[0]
+
+    if cluster_list is not None:
+        runners.append(
+            get_backend("MultiMachineRunner")(
                 name,
                 num_threads=num_threads,
                 username=username,
@@ -74,4 +95,19 @@ def init_runner(
                 conda_env=conda_env,
                 run_dir=run_dir,
                 result_dir=result_dir,
+                memory=memory,
             )
+        )
+        if not overflow:
+            return runners[0]
+
+    runners.append(
+        get_backend("SingleRunner")(
+            name, num_threads=num_threads, num_workers=num_workers
+        )
+    )
+    if not overflow:
+        return runners[0]
+    return get_backend("HybridRunner")(
+        name, runners=runners, max_queue_depth=max_queue_depth
+    )
@@ -1,7 +1,9 @@
 """Definition of all runner classes."""
 
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Dict, List, Optional
+
+from .planner import BackendPlan, Plan, estimate_plan
 
 
 class AbstractRunner(ABC):
@@ -15,6 +17,7 @@ class AbstractRunner(ABC):
         Number of threads to use.
     """
 
+    blocking = True  # Whether `run' returns only once the commands finished.
     name: str
     num_threads: int
 
@@ -33,6 +36,87 @@ class AbstractRunner(ABC):
         """
         raise NotImplementedError
 
+    def submit(self, cmd_list: List[str], indices: List[int]) -> List[str]:
+        """Run commands in list as part of a larger command list.
+
+        Runners that compose other runners (e.g. `HybridRunner') call `submit'
+        repeatedly with chunks of their command list, and `finish' once at the end.
+        Runners override it to avoid setting up and tearing down on every chunk.
+
+        Parameters
+        ----------
+        cmd_list: list
+        indices: list
+            Positions of the commands in the larger command list.
+
+        """
+        return self.run(cmd_list)
+
+    def finish(self) -> None:
+        """Finish a sequence of calls to `submit'."""
+        pass
+
+    def free_slots(self) -> Optional[int]:
+        """Return how many commands can start right now, or None if unknown."""
+        return None
+
+    def queue_depth(self) -> int:
+        """Return the number of submitted commands that have not started yet.
+
+        Runners that execute commands as soon as they are submitted have no queue.
+        """
+        return 0
+
+    def _backend_plan(
+        self, num_workers: int, dispatch_delay: float = 0.0
+    ) -> BackendPlan:
+        """Return the plan of this runner with its resource requests."""
+        return BackendPlan(
+            type(self).__name__,
+            num_workers,
+            dispatch_delay=dispatch_delay,
+            num_threads=self.num_threads,
+            memory=getattr(self, "memory", None),
+            wall_time=getattr(self, "wall_time", None),
+            max_array_size=getattr(self, "max_array_size", None),
+        )
+
+    def _plan_backends(
+        self, num_commands: int, num_workers: Optional[int] = None
+    ) -> List[BackendPlan]:
+        """Return the backends used to plan `num_commands' commands."""
+        return [self._backend_plan(num_workers or 1)]
+
+    def plan(
+        self,
+        cmd_list: List[str],
+        runtimes: Optional[Dict[str, float]] = None,
+        default_runtime: Optional[float] = None,
+        num_workers: Optional[int] = None,
+    ) -> Plan:
+        """Estimate the cost of running the commands in list, without running them.
+
+        Parameters
+        ----------
+        cmd_list: list
+        runtimes: dict, optional.
+            Historical runtimes, in seconds, of the commands.
+        default_runtime: float, optional.
+            Runtime, in seconds, of commands without history.
+        num_workers: int, optional.
+            Number of commands that run in parallel, if the runner cannot know it.
+
+        Returns
+        -------
+        plan: Plan
+        """
+        return estimate_plan(
+            cmd_list,
+            self._plan_backends(len(cmd_list), num_workers=num_workers),
+            runtimes=runtimes,
+            default_runtime=default_runtime,
+        )
+
     @abstractmethod
     def run_batch(self, cmd_list: List[str]) -> str:
         """Run commands in list in batch mode.
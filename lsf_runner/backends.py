@@ -0,0 +1,121 @@
+"""Registry of runner backends with lazy imports.
+
+Backends are registered by the dotted path of the module that defines them, so
+heavy dependencies (e.g. `paramiko' and `scp' for `MultiMachineRunner') are only
+imported when the backend is actually requested.
+Third-party packages can register extra backends through the
+`lsf_runner.backends' entry-point group.
+"""
+import importlib
+from typing import Dict, Iterator, List, Tuple, Type
+
+from .abstract_runner import AbstractRunner
+
+__author__ = "Sebastian Curi"
+__all__ = ["register_backend", "get_backend", "list_backends", "ENTRY_POINT_GROUP"]
+
+ENTRY_POINT_GROUP = "lsf_runner.backends"
+
+_BACKENDS = {
+    "IBMRunner": ("lsf_runner.ibm_runner", "IBMRunner"),
+    "SingleRunner": ("lsf_runner.single_machine_runner", "SingleRunner"),
+    "MultiMachineRunner": ("lsf_runner.multi_machine_runner", "MultiMachineRunner"),
+    "HybridRunner": ("lsf_runner.hybrid_runner", "HybridRunner"),
+}  # type: Dict[str, Tuple[str, str]]
+_LOADED = {}  # type: Dict[str, Type[AbstractRunner]]
+_entry_points_loaded = False
+
+
+def register_backend(name: str, module: str, attribute: str = "") -> None:
+    """Register a backend without importing it.
+
+    Parameters
+    ----------
+    name: str.
+        Name under which the backend is registered.
+    module: str.
+        Dotted path of the module that defines the backend.
+    attribute: str, optional (default=name).
+        Name of the runner class inside `module'.
+    """
+    _BACKENDS[name] = (module, attribute or name)
+    _LOADED.pop(name, None)
+
+
+def _iter_entry_points() -> Iterator[Tuple[str, str, str]]:
+    """Yield (name, module, attribute) of the entry points of the backend group.
+
+    `importlib.metadata' only exists from Python 3.8, so older interpreters use the
+    `importlib_metadata' backport or, if it is not installed, `pkg_resources'.
+    """
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:  # pragma: no cover
+        try:
+            from importlib_metadata import entry_points  # type: ignore
+        except ImportError:
+            try:
+                import pkg_resources
+            except ImportError:
+                return
+            for ep in pkg_resources.iter_entry_points(ENTRY_POINT_GROUP):
+                yield ep.name, ep.module_name, ".".join(ep.attrs)
+            return
+
+    eps = entry_points()
+    if hasattr(eps, "select"):
+        group = eps.select(group=ENTRY_POINT_GROUP)
+    else:  # pragma: no cover
+        group = eps.get(ENTRY_POINT_GROUP, [])
+
+    for ep in group:
+        module, _, attribute = ep.value.partition(":")
+        yield ep.name, module.strip(), attribute.strip()
+
+
+def _load_entry_points() -> None:
+    """Register the backends advertised by installed packages, only once."""
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+    for name, module, attribute in _iter_entry_points():
+        if name not in _BACKENDS:
+            register_backend(name, module, attribute)
+
+
+def list_backends() -> List[str]:
+    """Return the names of all registered backends."""
+    _load_entry_points()
+    return sorted(_BACKENDS)
+
+
+def get_backend(name: str) -> Type[AbstractRunner]:
+    """Import (if needed) and return the backend registered under `name'.
+
+    Parameters
+    ----------
+    name: str.
+        Name of the backend.
+
+    Returns
+    -------
+    backend: Type[AbstractRunner]
+        Runner class of the backend.
+
+    Raises
+    ------
+    KeyError
+        If no backend is registered under `name'.
+    """
+    if name in _LOADED:
+        return _LOADED[name]
+    if name not in _BACKENDS:
+        _load_entry_points()
+    if name not in _BACKENDS:
+        raise KeyError(f"Unknown backend {name}. Available: {list_backends()}.")
+
+    module, attribute = _BACKENDS[name]
+    backend = getattr(importlib.import_module(module), attribute)
+    _LOADED[name] = backend
+    return backend
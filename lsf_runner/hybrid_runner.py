@@ -0,0 +1,220 @@
+"""Runner that spreads commands over several backends at once."""
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .abstract_runner import AbstractRunner
+from .planner import BackendPlan
+
+
+class BackendStats(object):
+    """Statistics of a backend of a `HybridRunner'.
+
+    Parameters
+    ----------
+    runner: AbstractRunner.
+        Backend runner.
+    """
+
+    runner: AbstractRunner
+    num_commands: int
+    elapsed: float
+    in_flight: int
+
+    def __init__(self, runner: AbstractRunner):
+        self.runner = runner
+        self.num_commands = 0
+        self.elapsed = 0.0
+        self.in_flight = 0
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """Commands per second finished by a blocking backend, if it finished any."""
+        if not self.num_commands:
+            return None
+        return self.num_commands / max(self.elapsed, 1e-6)
+
+
+class HybridRunner(AbstractRunner):
+    """Runner that spreads a command list over several backends.
+
+    Each backend runs in its own thread and repeatedly takes a chunk of the
+    remaining commands, which it runs with `submit'. How many commands a backend
+    takes depends on its `free_slots' and on whether its `run' waits for the
+    commands to finish:
+
+    - Blocking backends that know their free slots (e.g. `SingleRunner', whose
+      workers persist across calls to `submit') take one command per idle worker,
+      or a single command, which starts as soon as a worker frees up.
+    - Other blocking backends take `chunk_size' commands scaled by their throughput
+      relative to the other such backends, so fast backends take more work than
+      slow ones.
+    - Backends that return once the commands are submitted (e.g. `IBMRunner' or
+      `MultiMachineRunner') take as many commands as they have `free_slots'. If
+      they do not know it, as many as needed to fill their queue up to
+      `max_queue_depth'. A backend without free slots (e.g. a backed-up LSF queue)
+      waits until they free up, and the other backends take the overflow.
+
+    When runner.run(cmd_list) is called, it returns, for each command in `cmd_list',
+    the output of the backend that ran it. The backend that ran each command is
+    stored in `assignments'.
+
+    Parameters
+    ----------
+    name: str.
+        Runner name.
+    runners: List[AbstractRunner].
+        Backends where to run the commands.
+    chunk_size: int, optional. (default=4).
+        Number of commands taken at a time by a blocking backend of average
+        throughput that does not know its free slots.
+    max_queue_depth: int, optional. (default=100).
+        Queue depth at which a non-blocking backend stops taking commands. If None,
+        these backends take `chunk_size' commands at a time.
+    poll_interval: float, optional. (default=5).
+        Waiting time, in seconds, before re-checking the free slots of a backend.
+    """
+
+    runners: List[AbstractRunner]
+    stats: List[BackendStats]
+    assignments: List[Optional[int]]
+
+    def __init__(
+        self,
+        name: str,
+        runners: List[AbstractRunner],
+        chunk_size: int = 4,
+        max_queue_depth: Optional[int] = 100,
+        poll_interval: float = 5,
+    ):
+        super().__init__(name, num_threads=max(r.num_threads for r in runners))
+        self.runners = runners
+        self.chunk_size = chunk_size
+        self.max_queue_depth = max_queue_depth
+        self.poll_interval = poll_interval
+        self.stats = [BackendStats(runner) for runner in runners]
+        self.assignments = []
+        self._lock = threading.Lock()
+
+    def queue_depth(self) -> int:
+        """See `AbstractRunner.queue_depth'."""
+        return sum(runner.queue_depth() for runner in self.runners)
+
+    def _plan_backends(
+        self, num_commands: int, num_workers: Optional[int] = None
+    ) -> List[BackendPlan]:
+        """See `AbstractRunner._plan_backends'.
+
+        Each backend plans its own workers and resource requests. Backends that
+        return once the commands are submitted run at most `max_queue_depth'
+        commands at a time, as in `run'.
+        """
+        backends = []
+        for runner in self.runners:
+            for backend in runner._plan_backends(num_commands):
+                if not runner.blocking and self.max_queue_depth is not None:
+                    backend.num_workers = min(
+                        backend.num_workers, max(1, self.max_queue_depth)
+                    )
+                backends.append(backend)
+        return backends
+
+    def _free_slots(self, index: int) -> Optional[int]:
+        """Return how many commands the backend can take now, None if unlimited."""
+        runner = self.runners[index]
+        slots = runner.free_slots()
+        if slots is None and not runner.blocking and self.max_queue_depth is not None:
+            slots = max(0, self.max_queue_depth - runner.queue_depth())
+        return slots
+
+    def _next_chunk_size(self, index: int) -> int:
+        """Return the number of commands that the backend takes next."""
+        slots = self._free_slots(index)
+        if not self.runners[index].blocking:
+            return self.chunk_size if slots is None else slots
+        if slots is not None:
+            return max(1, slots)
+
+        # Only chunks that are run to completion measure how fast commands finish.
+        known = [
+            s.throughput
+            for s in self.stats
+            if s.runner.blocking and s.runner.free_slots() is None and s.throughput
+        ]
+        throughput = self.stats[index].throughput
+        size = self.chunk_size
+        if throughput is not None and known:
+            size = max(1, round(size * throughput * len(known) / sum(known)))
+        return size
+
+    def _work(
+        self, index: int, tasks: List[int], cmd_list: List[str], outputs: List[str]
+    ) -> None:
+        stats = self.stats[index]
+        runner = self.runners[index]
+        while True:
+            with self._lock:
+                if not tasks:
+                    return
+            size = self._next_chunk_size(index)
+            with self._lock:
+                chunk, tasks[:] = tasks[:size], tasks[size:]
+                stats.in_flight += len(chunk)
+                for i in chunk:
+                    self.assignments[i] = index
+
+            if not chunk:
+                time.sleep(self.poll_interval)
+                continue
+
+            start = time.time()
+            try:
+                output = runner.submit([cmd_list[i] for i in chunk], chunk)
+            except Exception:
+                with self._lock:  # Let the other backends run the chunk.
+                    tasks[:0] = chunk
+                    stats.in_flight -= len(chunk)
+                    for i in chunk:
+                        self.assignments[i] = None
+                raise
+            with self._lock:
+                stats.elapsed += time.time() - start
+                stats.num_commands += len(chunk)
+                stats.in_flight -= len(chunk)
+                for i, out in zip(chunk, output):
+                    outputs[i] = out
+
+    def run(self, cmd_list: List[str]) -> List[str]:
+        """See `AbstractRunner.run'."""
+        self.assignments = [None] * len(cmd_list)
+        tasks = list(range(len(cmd_list)))
+        outputs = cmd_list.copy()
+        errors = {}  # type: Dict[int, Exception]
+
+        def work(index):
+            try:
+                self._work(index, tasks, cmd_list, outputs)
+            except Exception as e:
+                errors[index] = e
+
+        threads = [
+            threading.Thread(target=work, args=(i,), daemon=True)
+            for i in range(len(self.runners))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for index, runner in enumerate(self.runners):
+            if index not in errors:
+                runner.finish()
+
+        if len(errors) == len(self.runners):
+            raise RuntimeError(f"All backends failed: {errors}")
+        if tasks:  # A backend failed after the others had finished.
+            raise RuntimeError(f"{len(tasks)} commands were not run: {errors}")
+        return outputs
+
+    def run_batch(self, cmd_list: List[str]) -> str:
+        """See `AbstractRunner.run_batch'."""
+        return "".join(self.run(cmd_list))
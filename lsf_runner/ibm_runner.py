@@ -1,10 +1,12 @@
 """Definition of all runner classes."""
 
 import os
+import subprocess
 from datetime import datetime
 from typing import List, Optional
 
 from .abstract_runner import AbstractRunner
+from .planner import BackendPlan, split_array
 
 
 class IBMRunner(AbstractRunner):
@@ -27,6 +29,8 @@ class IBMRunner(AbstractRunner):
 
     """
 
+    blocking = False
+    max_array_size = 1000  # Default MAX_JOB_ARRAY_SIZE of LSF.
     use_gpu: bool
     wall_time: Optional[int]
     memory: Optional[int]
@@ -66,13 +70,36 @@ class IBMRunner(AbstractRunner):
 
         return bsub_cmd
 
+    def _plan_backends(
+        self, num_commands: int, num_workers: Optional[int] = None
+    ) -> List[BackendPlan]:
+        """See `AbstractRunner._plan_backends'. By default, all jobs start at once."""
+        return [self._backend_plan(num_workers or num_commands)]
+
+    def queue_depth(self) -> int:
+        """Return the number of pending jobs of the user, as reported by bjobs."""
+        try:
+            out = subprocess.run(
+                ["bjobs", "-noheader", "-o", "stat"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                universal_newlines=True,
+            ).stdout
+        except OSError:
+            return 0
+        return len([line for line in out.splitlines() if line.strip() == "PEND"])
+
     def run(self, cmd_list: List[str]) -> List[str]:
         """See `AbstractRunner.run'."""
+        return self.submit(cmd_list, list(range(len(cmd_list))))
+
+    def submit(self, cmd_list: List[str], indices: List[int]) -> List[str]:
+        """See `AbstractRunner.submit'. Jobs are named after their `indices'."""
         tasks = cmd_list[:]
 
         cmds = []
         bsub_cmd = self._build_base_cmd()
-        for i, cmd in enumerate(tasks):
+        for i, cmd in zip(indices, tasks):
             bsub_cmd_i = bsub_cmd
             if self.name is not None:
                 bsub_cmd_i += f'-J "{self.name}-{i}" '
@@ -83,8 +110,13 @@ class IBMRunner(AbstractRunner):
         return cmds
 
     def run_batch(self, cmd_list: List[str]) -> str:
-        """See `AbstractRunner.run_batch'."""
-        bsub_cmd = self._build_base_cmd()
+        """See `AbstractRunner.run_batch'.
+
+        Commands are submitted in job arrays of at most `max_array_size' jobs, the
+        ones reported by `plan'. The indices of every array start at 1, as LSF may
+        also bound them by MAX_JOB_ARRAY_SIZE.
+        """
+        base_cmd = self._build_base_cmd()
 
         current_time = datetime.now().strftime("%b%d_%H-%M-%S")
         cmd_file = f"logs/{self.name}_cmd_{current_time}"
@@ -93,9 +125,14 @@ class IBMRunner(AbstractRunner):
             for cmd in cmd_list:
                 f.write(cmd + "\n")
 
-        if self.name is not None:
-            bsub_cmd += f'-J "{self.name}[1-{len(cmd_list)}]"'
+        bsub_cmds = []
+        for first, last in split_array(len(cmd_list), self.max_array_size):
+            bsub_cmd = base_cmd
+            if self.name is not None:
+                bsub_cmd += f'-J "{self.name}[1-{last - first + 1}]"'
 
-        bsub_cmd += f" \"awk -v jindex=\\$LSB_JOBINDEX 'NR==jindex' {cmd_file} | bash\""
-        os.system(bsub_cmd)
-        return bsub_cmd
+            line = f"NR==jindex+{first - 1}"
+            bsub_cmd += f" \"awk -v jindex=\\$LSB_JOBINDEX '{line}' {cmd_file} | bash\""
+            os.system(bsub_cmd)
+            bsub_cmds.append(bsub_cmd)
+        return "\n".join(bsub_cmds)
@@ -1,12 +1,17 @@
 """Python Script Template."""
+import shlex
+import socket
 import time
-from queue import PriorityQueue
+import warnings
 from typing import List, Optional
 
 import paramiko
 from scp import SCPClient, SCPException
 
 from .abstract_runner import AbstractRunner
+from .placement import PlacementEngine
+from .planner import BackendPlan
+from .ssh_pool import SSHChannelLimitError, SSHConnectionError, SSHConnectionPool
 
 
 class MultiMachineRunner(AbstractRunner):
@@ -18,8 +23,11 @@ class MultiMachineRunner(AbstractRunner):
 
     When runner.run(cmd_list) is called it will run
 
-    ssh username@cluster tmux; cd run_dir; conda activate conda_env; command &
-    for each command in `cmd_list' and on the cluster with most actions.
+    ssh username@cluster cd run_dir; conda activate conda_env; nohup command &
+    for each command in `cmd_list'. Commands are placed with a `PlacementEngine',
+    which ranks the machines by measured speed and recent failure rate, starts
+    commands on every machine with free CPUs (and memory) in one pass, and moves
+    unstarted commands from busy machines to the ones that have run out of work.
 
     Parameters
     ----------
@@ -41,9 +49,25 @@ class MultiMachineRunner(AbstractRunner):
         If given, it will call cd `run_dir' before executing remotely.
     result_dir: str, optional.
         If given, it will scp the files at result_dir to the local directory.
+    memory: int, optional.
+        If given, memory in MB required by each command. Machines without enough
+        free memory do not get new commands.
+    benchmark: bool, optional. (default=False).
+        If True, it times `benchmark_cmd' at each machine to rank them by speed.
+    pool: SSHConnectionPool, optional.
+        Pool of ssh connections. Connections are kept open across calls to `run',
+        until `close' is called. If not given, the runner creates its own pool.
+    cpus_per_host: int, optional.
+        Number of CPUs of each machine, used by `plan' to estimate how many commands
+        run in parallel without connecting to the machines.
 
     """
 
+    benchmark_cmd = 'python -c "sum(i * i for i in range(10 ** 7))"'
+    blocking = False
+    pool: SSHConnectionPool
+    engine: Optional[PlacementEngine]
+
     def __init__(
         self,
         name: str,
@@ -55,6 +79,10 @@ class MultiMachineRunner(AbstractRunner):
         conda_env: Optional[str] = None,
         run_dir: Optional[str] = None,
         result_dir: Optional[str] = None,
+        memory: Optional[int] = None,
+        benchmark: bool = False,
+        pool: Optional[SSHConnectionPool] = None,
+        cpus_per_host: Optional[int] = None,
     ):
         super().__init__(name, num_threads=num_threads)
         self.username = username
@@ -64,119 +92,206 @@ class MultiMachineRunner(AbstractRunner):
         self.run_dir = run_dir
         self.result_dir = result_dir
         self.cluster_list = cluster_list
+        self.memory = memory
+        self.benchmark = benchmark
+        self.cpus_per_host = cpus_per_host
+        if pool is None:
+            pool = SSHConnectionPool(username, password, timeout=max_timeout)
+        self.pool = pool
+        self.engine = None
 
-    def _close(self, cluster_dict):
-        """Kill all processes."""
-        for name, ssh in cluster_dict.items():
-            if self._is_alive(ssh) and self.result_dir is not None:
-                scp = SCPClient(ssh.get_transport())
-                try:
-                    scp.get(
-                        self.result_dir,
-                        local_path="",
-                        recursive=True,
-                        preserve_times=True,
-                    )
-                except SCPException:
-                    pass
-                scp.close()
-
-        for ssh in cluster_dict.values():
-            ssh.close()
-
-    def _connect_to(self, name, ssh=None):
-        if ssh is None:
-            ssh = paramiko.SSHClient()
-
-        ssh.load_system_host_keys()
-        try:
-            ssh.connect(
-                hostname=name,
-                username=self.username,
-                password=self.password,
-                timeout=self.max_timeout,
-            )
-        except:
-            pass
-        return ssh
-
-    @staticmethod
-    def _is_alive(ssh):
-        transport = ssh.get_transport()
-        if transport is None:
-            is_alive = False
-        else:
-            is_alive = transport.is_active()
-        return is_alive
-
-    def _get_cpu_count(self, name, cluster_dict):
-        ssh = cluster_dict[name]
-        if not self._is_alive(ssh):
-            self._connect_to(name, ssh=ssh)
+    def close(self) -> None:
+        """Close all ssh connections of the runner."""
+        self.pool.close()
+
+    def _collect_results(self):
+        """Copy the results of every machine to the local directory."""
+        if self.result_dir is None:
+            return
+        for name in self.cluster_list:
+            try:
+                ssh = self.pool.get(name)
+            except SSHConnectionError as e:
+                warnings.warn(f"Results of {name} not copied. {e}")
+                continue
+            scp = SCPClient(ssh.get_transport())
+            try:
+                scp.get(
+                    self.result_dir, local_path="", recursive=True, preserve_times=True
+                )
+            except SCPException:
+                pass
+            scp.close()
+
+    def _read_int(self, name, command):
+        """Execute `command' at machine `name' and parse its output as an int.
+
+        Connection errors propagate as `SSHConnectionError', other failures give None.
+        """
         try:
-            _, out, _ = ssh.exec_command("nproc --all", timeout=self.max_timeout)
+            _, out, _ = self.pool.exec_command(name, command, timeout=self.max_timeout)
             return [int(o) for o in out.readlines()][0]
-        except:
-            return 0
+        except (SSHChannelLimitError, paramiko.SSHException, socket.error):
+            return None
+        except (ValueError, IndexError):  # Unexpected output.
+            return None
+
+    def _get_cpu_count(self, name):
+        return self._read_int(name, "nproc --all") or 0
 
-    def _get_available_cpu_count(self, name, cluster_dict):
-        ssh = cluster_dict[name]
-        if not self._is_alive(ssh):
-            self._connect_to(name, ssh=ssh)
+    def _get_available_cpu_count(self, name):
+        # A failed query (or all channels busy) means the machine takes no work.
+        return self._read_int(name, "python get_free_cpu_count.py") or 0
+
+    def _get_free_memory(self, name):
+        # A failed query means unknown memory, the machine is only limited by CPUs.
+        return self._read_int(
+            name, "awk '/MemAvailable/ {print int($2 / 1024)}' /proc/meminfo"
+        )
+
+    def _get_benchmark_time(self, name):
         try:
-            _, out, _ = ssh.exec_command(
-                "python get_free_cpu_count.py", timeout=self.max_timeout
-            )
-            return [int(o) for o in out.readlines()][0]
-        except:
-            return 0
+            start = time.time()
+            _, out, _ = self.pool.exec_command(name, self.benchmark_cmd)
+            if out.channel.recv_exit_status() != 0:
+                return None
+            return time.time() - start
+        except SSHConnectionError as e:
+            warnings.warn(f"Could not benchmark {name}. {e}")
+            return None
+        except (SSHChannelLimitError, paramiko.SSHException, socket.error):
+            return None
+
+    def _sample(self, engine):
+        """Update the free resources of every machine in the placement engine.
+
+        Raises
+        ------
+        SSHConnectionError
+            If no machine can be reached.
+        """
+        num_reachable = 0
+        for name in self.cluster_list:
+            try:
+                free_cpu = self._get_available_cpu_count(name)
+                free_memory = None
+                if self.memory is not None:
+                    free_memory = self._get_free_memory(name)
+            except SSHConnectionError as e:
+                warnings.warn(str(e))
+                free_cpu, free_memory = 0, None
+            else:
+                num_reachable += 1
+            engine.update(name, free_cpu=free_cpu, free_memory=free_memory)
 
-    def _run_at_machine(self, name, cluster_dict, command):
+        if not num_reachable:
+            raise SSHConnectionError(f"Could not connect to {self.cluster_list}.")
+
+    def _run_at_machine(self, name, command):
+        cmd = ""
+        if self.run_dir is not None:
+            cmd += f"cd {self.run_dir}; "
+        if self.conda_env is not None:
+            cmd += f"conda activate {self.conda_env}; "
+        # Detach the command from the session, so that the server closes the
+        # channel right away instead of when the command finishes.
+        cmd += f"nohup sh -c {shlex.quote(command)} > /dev/null 2>&1 < /dev/null &"
         try:
-            ssh = cluster_dict[name]
-            if not self._is_alive(ssh):
-                self._connect_to(name, ssh=ssh)
-
-            cmd = "tmux; "
-            if self.run_dir is not None:
-                cmd += f"cd {self.run_dir}; "
-            if self.conda_env is not None:
-                cmd += f"conda activate {self.conda_env}; "
-            cmd += f"{command} &"
-            ssh.exec_command(cmd, timeout=self.max_timeout)
+            self.pool.exec_command(name, cmd, timeout=self.max_timeout)
             return 0
-        except:
+        except SSHConnectionError as e:
+            warnings.warn(str(e))
+            return -1
+        except (SSHChannelLimitError, paramiko.SSHException, socket.error):
             return -1
 
-    def run(self, cmd_list: List[str]) -> List[str]:
-        """See `AbstractRunner.run'."""
-        cluster_dict = {name: self._connect_to(name) for name in self.cluster_list}
-        cluster_queue = PriorityQueue()  # type: PriorityQueue
-        for name, value in cluster_dict.items():
-            cluster_queue.put(
-                (-self._get_available_cpu_count(name, cluster_dict), 0, name)
+    def _plan_backends(
+        self, num_commands: int, num_workers: Optional[int] = None
+    ) -> List[BackendPlan]:
+        """See `AbstractRunner._plan_backends'.
+
+        Planning does not connect to the machines. Unless `num_workers' is given, the
+        workers of each machine are computed from `cpus_per_host' as the placement
+        engine does for idle machines. Without it, it assumes one worker per machine.
+        """
+        if num_workers is None and self.cpus_per_host is not None:
+            engine = PlacementEngine(self.cluster_list, num_threads=self.num_threads)
+            for name in self.cluster_list:
+                engine.update(name, free_cpu=self.cpus_per_host)
+            num_workers = sum(engine.capacity(name) for name in self.cluster_list)
+        elif num_workers is None:
+            warnings.warn(
+                "Without cpus_per_host, the plan assumes one worker per machine."
             )
+            num_workers = len(self.cluster_list)
+        return [self._backend_plan(num_workers)]
 
-        tasks = cmd_list.copy()
-        while tasks:
-            old_free_cpu, call_count, machine_name = cluster_queue.get()
-            new_free_cpu = self._get_available_cpu_count(machine_name, cluster_dict)
-            if new_free_cpu > 1 + self.num_threads:
-                command = tasks.pop()
-                exit_status = self._run_at_machine(
-                    machine_name, cluster_dict, command=command
-                )
-                if exit_status == 0:
-                    print(f"Remaining {len(tasks)} tasks")
-                    new_free_cpu -= self.num_threads
-                    cluster_queue.put((-new_free_cpu, call_count - 1, machine_name))
-                else:
-                    cluster_queue.put((-new_free_cpu, call_count - 1, machine_name))
-            else:
-                cluster_queue.put((-new_free_cpu, call_count - 1, machine_name))
-                time.sleep(self.max_timeout)
+    def _get_engine(self):
+        """Return the placement engine, which keeps the history across runs."""
+        if self.engine is None:
+            engine = PlacementEngine(
+                self.cluster_list, num_threads=self.num_threads, memory=self.memory
+            )
+            if self.benchmark:
+                for name in self.cluster_list:
+                    duration = self._get_benchmark_time(name)
+                    if duration is not None:
+                        engine.record_duration(name, duration)
+            self.engine = engine
+        return self.engine
+
+    def free_slots(self) -> Optional[int]:
+        """See `AbstractRunner.free_slots'."""
+        engine = self._get_engine()
+        self._sample(engine)
+        return sum(engine.capacity(name) for name in self.cluster_list)
+
+    def submit(self, cmd_list: List[str], indices: List[int]) -> List[str]:
+        """See `AbstractRunner.submit'.
+
+        It dispatches the commands with the current samples of the machines, and
+        does not copy the results until `finish' is called.
+        """
+        engine = self._get_engine()
+        engine.plan(cmd_list)
+        try:
+            while engine.pending:
+                num_started = 0
+                dispatch = engine.dispatch()
+                remaining = engine.pending + len(dispatch)
+                for machine_name, command in dispatch:
+                    exit_status = self._run_at_machine(machine_name, command=command)
+                    engine.record_result(machine_name, exit_status == 0)
+                    if exit_status == 0:
+                        num_started += 1
+                        remaining -= 1
+                        print(f"Remaining {remaining} tasks")
+                    else:
+                        engine.requeue(machine_name, command)
+
+                if engine.pending:
+                    if not num_started:
+                        time.sleep(self.max_timeout)
+                    self._sample(engine)
+        finally:  # Do not leave commands of a failed call for the next one.
+            for queue in engine.queues.values():
+                queue.clear()
+
+        return cmd_list
+
+    def finish(self) -> None:
+        """See `AbstractRunner.finish'. Copy the results of every machine."""
+        self._collect_results()
+
+    def run(self, cmd_list: List[str]) -> List[str]:
+        """See `AbstractRunner.run'.
 
-        self._close(cluster_dict)
+        The ssh connections stay open in `pool' after the run, call `close' to
+        release them.
+        """
+        self._sample(self._get_engine())
+        self.submit(cmd_list, list(range(len(cmd_list))))
+        self.finish()
 
         return cmd_list
 
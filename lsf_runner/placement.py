@@ -0,0 +1,215 @@
+"""Heterogeneity-aware placement of commands on a set of hosts."""
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+__author__ = "Sebastian Curi"
+__all__ = ["HostStats", "PlacementEngine"]
+
+
+class HostStats(object):
+    """Statistics of a single host.
+
+    Parameters
+    ----------
+    name: str.
+        Host name.
+    window: int, optional. (default=10).
+        Number of recent dispatches used to compute the failure rate.
+    """
+
+    name: str
+    free_cpu: int
+    free_memory: Optional[int]
+    duration: Optional[float]
+    results: Deque[bool]
+
+    def __init__(self, name: str, window: int = 10):
+        self.name = name
+        self.free_cpu = 0
+        self.free_memory = None
+        self.duration = None
+        self.results = deque(maxlen=window)
+
+    @property
+    def failure_rate(self) -> float:
+        """Fraction of the recent dispatches that failed."""
+        if not self.results:
+            return 0.0
+        return self.results.count(False) / len(self.results)
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """Jobs per second of a single worker, if the duration is known."""
+        if not self.duration:
+            return None
+        return 1.0 / self.duration
+
+
+class PlacementEngine(object):
+    """Placement engine that distributes commands across heterogeneous hosts.
+
+    Each host keeps a queue of commands that are assigned but not yet started.
+    Hosts are scored by their measured throughput and recent failure rate, and
+    commands are assigned so that faster hosts get proportionally more work.
+    Every call to `dispatch' starts as many commands as each host has capacity for,
+    limited by free CPUs and free memory, after moving unstarted commands from the
+    queues of hosts without capacity to hosts that have run out of work.
+
+    Parameters
+    ----------
+    hosts: List[str].
+        Host names.
+    num_threads: int, optional. (default=1).
+        Number of threads used by each command.
+    memory: int, optional. (default=None).
+        Memory, in MB, used by each command. If None, memory is not checked.
+    cpu_reserve: int, optional. (default=2).
+        Number of CPUs that are always left free at each host.
+    alpha: float, optional. (default=0.3).
+        Smoothing factor of the exponential average of job durations.
+    window: int, optional. (default=10).
+        Number of recent dispatches used to compute the failure rate.
+    """
+
+    hosts: Dict[str, HostStats]
+    queues: Dict[str, List[str]]
+
+    def __init__(
+        self,
+        hosts: List[str],
+        num_threads: int = 1,
+        memory: Optional[int] = None,
+        cpu_reserve: int = 2,
+        alpha: float = 0.3,
+        window: int = 10,
+    ):
+        self.num_threads = num_threads
+        self.memory = memory
+        self.cpu_reserve = cpu_reserve
+        self.alpha = alpha
+        self.hosts = {name: HostStats(name, window=window) for name in hosts}
+        self.queues = {name: [] for name in hosts}
+
+    @property
+    def pending(self) -> int:
+        """Number of commands assigned but not yet started."""
+        return sum(len(queue) for queue in self.queues.values())
+
+    def update(
+        self, host: str, free_cpu: int, free_memory: Optional[int] = None
+    ) -> None:
+        """Update the resource sample of a host."""
+        self.hosts[host].free_cpu = free_cpu
+        self.hosts[host].free_memory = free_memory
+
+    def record_duration(self, host: str, duration: float) -> None:
+        """Record the duration, in seconds, of a job (or benchmark) at a host."""
+        stats = self.hosts[host]
+        if stats.duration is None:
+            stats.duration = duration
+        else:
+            stats.duration = self.alpha * duration + (1 - self.alpha) * stats.duration
+
+    def record_result(self, host: str, success: bool) -> None:
+        """Record whether a dispatch to a host succeeded."""
+        self.hosts[host].results.append(success)
+
+    def capacity(self, host: str) -> int:
+        """Return how many commands can be started now at a host."""
+        stats = self.hosts[host]
+        slots = max(0, (stats.free_cpu - self.cpu_reserve) // self.num_threads)
+        if self.memory is not None and stats.free_memory is not None:
+            slots = min(slots, stats.free_memory // self.memory)
+        return slots
+
+    def score(self, host: str) -> float:
+        """Return the relative speed of a host, penalized by its failure rate.
+
+        Hosts without a measured throughput get the average of the measured ones.
+        """
+        known = [s.throughput for s in self.hosts.values() if s.throughput]
+        default = sum(known) / len(known) if known else 1.0
+        stats = self.hosts[host]
+        throughput = stats.throughput or default
+        return throughput * (1.0 - stats.failure_rate)
+
+    def _ranked(self) -> List[str]:
+        """Return hosts from best to worst, breaking ties by free memory."""
+        return sorted(
+            self.hosts,
+            key=lambda h: (self.score(h), self.hosts[h].free_memory or 0),
+            reverse=True,
+        )
+
+    def plan(self, cmd_list: List[str]) -> None:
+        """Assign commands to the host queues.
+
+        Each command goes to the host where it is expected to finish first.
+        """
+        scores = {host: self.score(host) for host in self.hosts}
+        if not any(scores.values()):
+            scores = {host: 1.0 for host in self.hosts}
+        candidates = [host for host in self._ranked() if scores[host] > 0]
+        for cmd in cmd_list:
+            host = min(
+                candidates,
+                key=lambda h: (len(self.queues[h]) + 1) / scores[h],
+            )
+            self.queues[host].append(cmd)
+
+    def requeue(self, host: str, cmd: str) -> None:
+        """Put back a command whose dispatch to `host' failed."""
+        self.queues[host].insert(0, cmd)
+
+    def rebalance(self) -> int:
+        """Move unstarted commands to hosts with spare capacity.
+
+        Commands are taken from the back of the queues of the slowest hosts that
+        cannot start them now.
+
+        Returns
+        -------
+        moved: int
+            Number of commands moved.
+        """
+        ranked = self._ranked()
+        moved = 0
+        for host in ranked:
+            spare = self.capacity(host) - len(self.queues[host])
+            for donor in reversed(ranked):
+                if spare <= 0:
+                    break
+                if donor == host:
+                    continue
+                surplus = len(self.queues[donor]) - self.capacity(donor)
+                num_moved = min(spare, max(0, surplus))
+                if num_moved > 0:
+                    donated = self.queues[donor][-num_moved:]
+                    del self.queues[donor][-num_moved:]
+                    self.queues[host].extend(donated)
+                    spare -= num_moved
+                    moved += num_moved
+        return moved
+
+    def dispatch(self) -> List[Tuple[str, str]]:
+        """Pop the commands that can be started now at every host.
+
+        The resource samples of the hosts are decreased by the resources of the
+        popped commands, so a stale sample never over-subscribes a host.
+
+        Returns
+        -------
+        dispatch: List[Tuple[str, str]]
+            List of (host, command) pairs, best hosts first.
+        """
+        self.rebalance()
+        dispatch = []
+        for host in self._ranked():
+            num = min(self.capacity(host), len(self.queues[host]))
+            cmds, self.queues[host] = self.queues[host][:num], self.queues[host][num:]
+            stats = self.hosts[host]
+            stats.free_cpu -= num * self.num_threads
+            if self.memory is not None and stats.free_memory is not None:
+                stats.free_memory -= num * self.memory
+            dispatch += [(host, cmd) for cmd in cmds]
+        return dispatch
@@ -0,0 +1,235 @@
+"""Dry-run planning of command lists, without executing anything."""
+import heapq
+import json
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+__author__ = "Sebastian Curi"
+__all__ = ["BackendPlan", "Plan", "estimate_plan", "load_runtimes", "split_array"]
+
+
+def split_array(
+    num_commands: int, max_array_size: Optional[int]
+) -> List[Tuple[int, int]]:
+    """Return the 1-based index ranges of the job arrays needed for the commands."""
+    if not num_commands:
+        return []
+    if max_array_size is None:
+        return [(1, num_commands)]
+    return [
+        (start + 1, min(start + max_array_size, num_commands))
+        for start in range(0, num_commands, max_array_size)
+    ]
+
+
+class BackendPlan(object):
+    """Estimated share of a backend in a plan.
+
+    Parameters
+    ----------
+    name: str.
+        Backend name.
+    num_workers: int.
+        Number of commands that the backend runs in parallel.
+    dispatch_delay: float, optional. (default=0).
+        Time, in seconds, that the backend waits between two dispatches.
+    num_threads: int, optional. (default=1).
+        Number of threads used by each command.
+    memory: int, optional.
+        Memory, in MB, requested by each command.
+    wall_time: int, optional.
+        Wall time, in minutes, requested by each command.
+    max_array_size: int, optional.
+        Maximum number of jobs in a job array.
+    """
+
+    name: str
+    num_workers: int
+    dispatch_delay: float
+    num_threads: int
+    memory: Optional[int]
+    wall_time: Optional[int]
+    max_array_size: Optional[int]
+    num_commands: int
+    makespan: float
+    array_chunks: List[Tuple[int, int]]
+
+    def __init__(
+        self,
+        name: str,
+        num_workers: int,
+        dispatch_delay: float = 0.0,
+        num_threads: int = 1,
+        memory: Optional[int] = None,
+        wall_time: Optional[int] = None,
+        max_array_size: Optional[int] = None,
+    ):
+        self.name = name
+        self.num_workers = max(1, num_workers)
+        self.dispatch_delay = dispatch_delay
+        self.num_threads = num_threads
+        self.memory = memory
+        self.wall_time = wall_time
+        self.max_array_size = max_array_size
+        self.num_commands = 0
+        self.makespan = 0.0
+        self.array_chunks = []
+
+    @property
+    def peak_memory(self) -> Optional[int]:
+        """Memory, in MB, requested by the commands that run in parallel."""
+        if self.memory is None:
+            return None
+        return self.memory * min(self.num_workers, self.num_commands)
+
+
+class Plan(object):
+    """Estimated cost of running a command list.
+
+    Attributes
+    ----------
+    num_commands: int.
+        Number of commands.
+    duplicates: List[str].
+        Commands that appear more than once.
+    core_hours: float.
+        Estimated total core-hours, runtime times threads of every command.
+    makespan: float.
+        Estimated time, in seconds, until the last command finishes.
+    backends: List[BackendPlan].
+        Number of workers, commands and makespan of each backend.
+    array_chunks: List[Tuple[int, int]].
+        1-based index ranges of the job arrays needed to submit the commands of
+        each backend, see `BackendPlan.array_chunks'.
+    over_wall_time: List[str].
+        Commands whose estimated runtime exceeds the requested wall time.
+    num_unknown_runtime: int.
+        Number of commands without a runtime estimate, counted as 0 seconds.
+    peak_memory: int, optional.
+        Memory, in MB, requested by all commands running in parallel in the
+        backends that request memory.
+    """
+
+    def __init__(self):
+        self.num_commands = 0
+        self.duplicates = []  # type: List[str]
+        self.core_hours = 0.0
+        self.makespan = 0.0
+        self.backends = []  # type: List[BackendPlan]
+        self.array_chunks = []  # type: List[Tuple[int, int]]
+        self.over_wall_time = []  # type: List[str]
+        self.num_unknown_runtime = 0
+        self.peak_memory = None  # type: Optional[int]
+
+    def __str__(self) -> str:
+        """Return a human readable summary of the plan."""
+        lines = [
+            f"Commands: {self.num_commands}",
+            f"Core-hours: {self.core_hours:.2f}",
+            f"Makespan: {self.makespan / 3600:.2f} h",
+        ]
+        for backend in self.backends:
+            lines.append(
+                f"  {backend.name}: {backend.num_commands} commands on "
+                f"{backend.num_workers} workers, {backend.makespan / 3600:.2f} h"
+            )
+        if self.peak_memory is not None:
+            lines.append(f"Peak memory: {self.peak_memory} MB")
+        if len(self.array_chunks) > 1:
+            lines.append(f"Job arrays: {len(self.array_chunks)}")
+        if self.duplicates:
+            lines.append(f"WARNING: {len(self.duplicates)} duplicate commands.")
+        if self.over_wall_time:
+            lines.append(
+                f"WARNING: {len(self.over_wall_time)} commands exceed the wall time."
+            )
+        if self.num_unknown_runtime:
+            lines.append(
+                f"WARNING: {self.num_unknown_runtime} commands without runtime."
+            )
+        return "\n".join(lines)
+
+
+def load_runtimes(path: str) -> Dict[str, float]:
+    """Load historical runtimes, a JSON object mapping commands to seconds."""
+    with open(path, "r") as f:
+        return {cmd: float(runtime) for cmd, runtime in json.load(f).items()}
+
+
+def estimate_plan(
+    cmd_list: List[str],
+    backends: List[BackendPlan],
+    runtimes: Optional[Dict[str, float]] = None,
+    default_runtime: Optional[float] = None,
+) -> Plan:
+    """Estimate the cost of running `cmd_list' on `backends'.
+
+    Commands are dispatched in order to the first free worker of any backend, as
+    the runners do. Threads, memory, wall time and job arrays are those of the
+    backend that runs each command.
+
+    Parameters
+    ----------
+    cmd_list: List[str].
+        Commands, e.g. the output of `make_commands'.
+    backends: List[BackendPlan].
+        Backends where the commands run.
+    runtimes: dict, optional.
+        Historical runtimes, in seconds, of the commands.
+    default_runtime: float, optional.
+        Runtime, in seconds, of commands without history. If None, it is the mean of
+        the historical runtimes or, if there are none, the longest wall time.
+
+    Returns
+    -------
+    plan: Plan
+    """
+    runtimes = runtimes or {}
+    if default_runtime is None:
+        wall_times = [b.wall_time for b in backends if b.wall_time is not None]
+        if runtimes:
+            default_runtime = sum(runtimes.values()) / len(runtimes)
+        elif wall_times:
+            default_runtime = 60.0 * max(wall_times)
+
+    plan = Plan()
+    plan.num_commands = len(cmd_list)
+    plan.duplicates = [cmd for cmd, count in Counter(cmd_list).items() if count > 1]
+    plan.backends = backends
+
+    # Each heap entry is (time at which the worker is free, backend index).
+    workers = [(0.0, i) for i, b in enumerate(backends) for _ in range(b.num_workers)]
+    heapq.heapify(workers)
+    next_dispatch = [0.0] * len(backends)
+    core_seconds = 0.0
+    for cmd in cmd_list:
+        duration = runtimes.get(cmd, default_runtime)
+        if duration is None:
+            plan.num_unknown_runtime += 1
+            duration = 0.0
+
+        free_time, i = heapq.heappop(workers)
+        backend = backends[i]
+        start = max(free_time, next_dispatch[i])
+        next_dispatch[i] = start + backend.dispatch_delay
+        backend.num_commands += 1
+        backend.makespan = max(backend.makespan, start + duration)
+        heapq.heappush(workers, (start + duration, i))
+
+        core_seconds += backend.num_threads * duration
+        if backend.wall_time is not None and duration > 60 * backend.wall_time:
+            plan.over_wall_time.append(cmd)
+
+    plan.core_hours = core_seconds / 3600
+    plan.makespan = max((b.makespan for b in backends), default=0.0)
+
+    memories = [b.peak_memory for b in backends if b.peak_memory is not None]
+    if memories:
+        plan.peak_memory = sum(memories)
+    for backend in backends:
+        if backend.max_array_size is not None:
+            backend.array_chunks = split_array(
+                backend.num_commands, backend.max_array_size
+            )
+            plan.array_chunks += backend.array_chunks
+    return plan
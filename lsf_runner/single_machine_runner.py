@@ -7,6 +7,7 @@ import warnings
 from typing import List, Optional
 
 from .abstract_runner import AbstractRunner
+from .planner import BackendPlan
 from .util import start_process
 
 
@@ -15,6 +16,7 @@ class SingleRunner(AbstractRunner):
 
     The runner submits the jobs in parallel to the `num_workers'. While the workers are
     working, it keeps on checking and spawns a new job every time a worker is freed up.
+    The workers persist across calls to `submit', until `finish' is called.
 
     Parameters
     ----------
@@ -26,7 +28,9 @@ class SingleRunner(AbstractRunner):
         Number of workers where to run the process.
     """
 
+    dispatch_delay = 1  # Seconds between two dispatches.
     num_workers: int
+    _pool: List[multiprocessing.Process]
 
     def __init__(
         self, name: str, num_threads: int = 1, num_workers: Optional[int] = None
@@ -41,26 +45,55 @@ class SingleRunner(AbstractRunner):
             num_workers = max(1, multiprocessing.cpu_count() // num_threads - 1)
             warnings.warn(f"Too many workers requested. Limiting them to {num_workers}")
         self.num_workers = num_workers
+        self._pool = []
 
-    def run(self, cmd_list: List[str]) -> List[str]:
-        """See `AbstractRunner.run'."""
-        workers_idle = [False] * self.num_workers
-        pool = [start_process(lambda: None) for _ in range(self.num_workers)]
+    def _plan_backends(
+        self, num_commands: int, num_workers: Optional[int] = None
+    ) -> List[BackendPlan]:
+        """See `AbstractRunner._plan_backends'."""
+        num_workers = num_workers or self.num_workers
+        return [self._backend_plan(num_workers, self.dispatch_delay)]
+
+    def free_slots(self) -> int:
+        """See `AbstractRunner.free_slots'. It counts the idle workers."""
+        if not self._pool:
+            return self.num_workers
+        return sum(not process.is_alive() for process in self._pool)
+
+    def submit(self, cmd_list: List[str], indices: List[int]) -> List[str]:
+        """See `AbstractRunner.submit'.
+
+        It returns once every command started in a worker, without waiting for the
+        commands to finish.
+        """
+        if not self._pool:
+            self._pool = [start_process(lambda: None) for _ in range(self.num_workers)]
         tasks = cmd_list[:]
 
-        while not all(workers_idle):
+        while len(tasks) > 0:
             for i in range(self.num_workers):
-                if not pool[i].is_alive():
-                    pool[i].terminate()
-                    if len(tasks) > 0:
-                        time.sleep(1)
-                        cmd = tasks.pop(0)
-                        pool[i] = start_process(lambda x: os.system(x), (cmd,))
-                    else:
-                        workers_idle[i] = True
+                if len(tasks) > 0 and not self._pool[i].is_alive():
+                    self._pool[i].terminate()
+                    time.sleep(self.dispatch_delay)
+                    cmd = tasks.pop(0)
+                    self._pool[i] = start_process(lambda x: os.system(x), (cmd,))
+            if len(tasks) > 0 and not self.free_slots():
+                time.sleep(0.01)  # Let other threads (e.g. of `HybridRunner') run.
 
         return cmd_list
 
+    def finish(self) -> None:
+        """Wait until the commands of all calls to `submit' finish."""
+        for process in self._pool:
+            process.join()
+        self._pool = []
+
+    def run(self, cmd_list: List[str]) -> List[str]:
+        """See `AbstractRunner.run'."""
+        self.submit(cmd_list, list(range(len(cmd_list))))
+        self.finish()
+        return cmd_list
+
     def run_batch(self, cmd_list: List[str]) -> str:
         """See `AbstractRunner.run_batch'."""
         return "".join(self.run(cmd_list))
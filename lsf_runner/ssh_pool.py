@@ -0,0 +1,243 @@
+"""Pool of SSH connections that is shared across runs."""
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import paramiko
+
+__author__ = "Sebastian Curi"
+__all__ = ["SSHConnectionError", "SSHChannelLimitError", "SSHConnectionPool"]
+
+
+class SSHConnectionError(Exception):
+    """Raised when a connection to a host cannot be established."""
+
+
+class SSHChannelLimitError(Exception):
+    """Raised when a host has no free channel to execute a command."""
+
+
+class SSHConnectionPool(object):
+    """Pool of SSH connections, one transport per host.
+
+    Connections are opened on demand and reused until they fail a health check, so
+    several calls to `MultiMachineRunner.run' only pay the handshake once per host.
+    Each transport sends keepalives and multiplexes at most `max_channels'
+    concurrent channels. A channel counts until the server closes it, which happens
+    only once no remote process holds its stdout or stderr, so background commands
+    should redirect them (see `MultiMachineRunner'). After a failed connection, the
+    host is not retried until an exponentially growing backoff has elapsed.
+
+    Parameters
+    ----------
+    username: str.
+        User name of the ssh connections.
+    password: str.
+        Password of the ssh connections.
+    timeout: float, optional. (default=3).
+        Timeout, in seconds, to establish a connection.
+    keepalive: int, optional. (default=30).
+        Interval, in seconds, between keepalive packets. 0 disables them.
+    max_channels: int, optional. (default=8).
+        Maximum number of concurrent channels per host. It should not exceed the
+        MaxSessions setting of the ssh servers (10 by default).
+    backoff: float, optional. (default=1).
+        Initial waiting time, in seconds, before reconnecting to a failed host.
+    max_backoff: float, optional. (default=60).
+        Maximum waiting time, in seconds, before reconnecting to a failed host.
+    client_factory: callable, optional. (default=paramiko.SSHClient).
+        Function that returns a new, unconnected, ssh client.
+
+    """
+
+    stats: Dict[str, int]
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        timeout: float = 3,
+        keepalive: int = 30,
+        max_channels: int = 8,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        client_factory: Optional[Callable[[], paramiko.SSHClient]] = None,
+    ):
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.keepalive = keepalive
+        self.max_channels = max_channels
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.client_factory = client_factory or paramiko.SSHClient
+
+        self._lock = threading.Lock()
+        self._host_locks = {}  # type: Dict[str, threading.Lock]
+        self._clients = {}  # type: Dict[str, paramiko.SSHClient]
+        self._channels = {}  # type: Dict[str, List[paramiko.Channel]]
+        self._num_failures = {}  # type: Dict[str, int]
+        self._retry_at = {}  # type: Dict[str, float]
+        self.stats = dict(connects=0, reuses=0, reconnects=0, failures=0)
+
+    @property
+    def reuse_ratio(self) -> float:
+        """Fraction of the requested connections that reused an open transport."""
+        total = self.stats["connects"] + self.stats["reuses"]
+        return self.stats["reuses"] / total if total else 0.0
+
+    @staticmethod
+    def is_healthy(ssh: paramiko.SSHClient) -> bool:
+        """Check that the transport of a client is active and responsive."""
+        transport = ssh.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        try:
+            transport.send_ignore()
+        except (paramiko.SSHException, socket.error, EOFError):
+            return False
+        return True
+
+    def _connect(self, host: str) -> paramiko.SSHClient:
+        """Open a new connection to `host', respecting its backoff."""
+        if time.time() < self._retry_at.get(host, 0.0):
+            raise SSHConnectionError(f"{host} is backing off after a failure.")
+
+        ssh = self.client_factory()
+        ssh.load_system_host_keys()
+        try:
+            ssh.connect(
+                hostname=host,
+                username=self.username,
+                password=self.password,
+                timeout=self.timeout,
+            )
+        except (paramiko.SSHException, socket.error) as e:
+            ssh.close()
+            num_failures = self._num_failures.get(host, 0) + 1
+            self._num_failures[host] = num_failures
+            delay = min(self.max_backoff, self.backoff * 2 ** (num_failures - 1))
+            self._retry_at[host] = time.time() + delay
+            self._count("failures")
+            raise SSHConnectionError(f"Could not connect to {host}: {e}") from e
+
+        transport = ssh.get_transport()
+        if self.keepalive and transport is not None:
+            transport.set_keepalive(self.keepalive)
+        self._num_failures.pop(host, None)
+        self._retry_at.pop(host, None)
+        self._count("connects")
+        return ssh
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _host_lock(self, host: str) -> threading.Lock:
+        """Return the lock of `host', so that hosts connect independently."""
+        with self._lock:
+            if host not in self._host_locks:
+                self._host_locks[host] = threading.Lock()
+                self._channels[host] = []
+            return self._host_locks[host]
+
+    def get(self, host: str) -> paramiko.SSHClient:
+        """Return a healthy connection to `host', opening one if needed.
+
+        Raises
+        ------
+        SSHConnectionError
+            If the host is unreachable or still backing off after a failure.
+        """
+        with self._host_lock(host):
+            ssh = self._clients.get(host)
+            if ssh is not None:
+                if self.is_healthy(ssh):
+                    self._count("reuses")
+                    return ssh
+                ssh.close()
+                del self._clients[host]
+                self._channels[host] = []
+                self._count("reconnects")
+
+            ssh = self._connect(host)
+            self._clients[host] = ssh
+            return ssh
+
+    def _num_open(self, host: str) -> int:
+        """Forget the channels that reached EOF and count the others.
+
+        The exit status is not enough: a shell that leaves a job in the background
+        exits at once, but its session stays open while the job holds the output.
+        """
+        self._channels[host] = [
+            c for c in self._channels[host] if not (c.closed or c.eof_received)
+        ]
+        return len(self._channels[host])
+
+    def open_channels(self, host: str) -> int:
+        """Return the number of channels to `host' that are still open."""
+        with self._host_lock(host):
+            return self._num_open(host)
+
+    def exec_command(
+        self, host: str, command: str, timeout: Optional[float] = None, wait: float = 0
+    ) -> Tuple[Any, Any, Any]:
+        """Execute `command' at `host' in a new channel of the pooled connection.
+
+        Parameters
+        ----------
+        host: str.
+            Host name.
+        command: str.
+            Command to execute.
+        timeout: float, optional.
+            Timeout of the channel, see `paramiko.SSHClient.exec_command'.
+        wait: float, optional. (default=0).
+            Maximum time, in seconds, to wait for a free channel.
+
+        Returns
+        -------
+        stdin, stdout, stderr
+            Streams of the command, see `paramiko.SSHClient.exec_command'.
+
+        Raises
+        ------
+        SSHConnectionError
+            If the host is unreachable or still backing off after a failure.
+        SSHChannelLimitError
+            If `max_channels' channels are still open at the host after `wait'.
+        """
+        ssh = self.get(host)
+        deadline = time.time() + wait
+        while True:
+            with self._host_lock(host):
+                if self._num_open(host) < self.max_channels:
+                    stdin, stdout, stderr = ssh.exec_command(command, timeout=timeout)
+                    self._channels[host].append(stdout.channel)
+                    return stdin, stdout, stderr
+            if time.time() >= deadline:
+                raise SSHChannelLimitError(
+                    f"{host} has {self.max_channels} channels open."
+                )
+            time.sleep(0.05)
+
+    def close(self, host: Optional[str] = None) -> None:
+        """Close the connection to `host', or all connections if it is None."""
+        with self._lock:
+            hosts = list(self._clients) if host is None else [host]
+        for name in hosts:
+            with self._host_lock(name):
+                ssh = self._clients.pop(name, None)
+                self._channels[name] = []
+                if ssh is not None:
+                    ssh.close()
+
+    def __enter__(self) -> "SSHConnectionPool":
+        """Use the pool as a context manager that closes all connections."""
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        """Close all connections."""
+        self.close()
@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import lsf_runner
+from lsf_runner import backends, get_backend, list_backends, register_backend
+from lsf_runner.single_machine_runner import SingleRunner
+
+# Maximum cumulative time, in microseconds, that `import lsf_runner' may take.
+IMPORT_TIME_THRESHOLD = int(os.environ.get("LSF_RUNNER_IMPORT_THRESHOLD", 150_000))
+
+
+def import_time():
+    """Run `python -X importtime -c 'import lsf_runner'' and parse its output."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import lsf_runner"],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    ).stderr
+    cumulative = {}
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cum, package = line[len("import time:") :].split("|")
+        cumulative[package.strip()] = int(cum)
+    return cumulative
+
+
+def test_import_does_not_load_ssh():
+    modules = import_time()
+    assert "paramiko" not in modules
+    assert "scp" not in modules
+    assert "lsf_runner.multi_machine_runner" not in modules
+
+
+def test_import_time_regression():
+    modules = import_time()
+    assert modules["lsf_runner"] < IMPORT_TIME_THRESHOLD
+
+
+def test_lazy_attribute():
+    assert lsf_runner.SingleRunner is SingleRunner
+    assert get_backend("SingleRunner") is SingleRunner
+    with pytest.raises(AttributeError):
+        lsf_runner.NotARunner
+
+
+def test_register_backend(monkeypatch):
+    monkeypatch.setattr(backends, "_BACKENDS", backends._BACKENDS.copy())
+    monkeypatch.setattr(backends, "_LOADED", backends._LOADED.copy())
+    register_backend("Local", "lsf_runner.single_machine_runner", "SingleRunner")
+    assert "Local" in list_backends()
+    assert get_backend("Local") is SingleRunner
+    with pytest.raises(KeyError):
+        get_backend("NotARunner")
+
+    monkeypatch.undo()
+    assert "Local" not in list_backends()
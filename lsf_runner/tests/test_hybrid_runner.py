@@ -0,0 +1,136 @@
+import time
+
+import pytest
+
+from lsf_runner import HybridRunner, IBMRunner, SingleRunner, init_runner
+from lsf_runner.abstract_runner import AbstractRunner
+
+
+class FakeRunner(AbstractRunner):
+    def __init__(self, name, delay=0.0, depth=0, fail=False, blocking=True):
+        super().__init__(name)
+        self.delay = delay
+        self.depth = depth
+        self.fail = fail
+        self.blocking = blocking
+        self.ran = []
+
+    def queue_depth(self):
+        return self.depth
+
+    def run(self, cmd_list):
+        if self.fail:
+            raise ValueError("backend down")
+        time.sleep(self.delay * len(cmd_list))
+        self.ran += cmd_list
+        return [f"{self.name}:{cmd}" for cmd in cmd_list]
+
+    def run_batch(self, cmd_list):
+        return "".join(self.run(cmd_list))
+
+
+@pytest.fixture()
+def cmds():
+    return [f"cmd{i}" for i in range(40)]
+
+
+def test_unified_output(cmds):
+    fast, slow = FakeRunner("fast", delay=0.001), FakeRunner("slow", delay=0.02)
+    runner = HybridRunner("test", [fast, slow], chunk_size=2)
+    outputs = runner.run(cmds)
+
+    assert len(fast.ran) + len(slow.ran) == len(cmds)
+    assert len(fast.ran) > len(slow.ran)
+    for cmd, output, index in zip(cmds, outputs, runner.assignments):
+        assert output == f"{runner.runners[index].name}:{cmd}"
+
+
+def test_overflow(cmds):
+    lsf = FakeRunner("lsf", depth=100, blocking=False)
+    local = FakeRunner("local", delay=0.001)
+    runner = HybridRunner("test", [lsf, local], max_queue_depth=10, poll_interval=0)
+    runner.run(cmds)
+    assert lsf.ran == []
+    assert sorted(local.ran) == sorted(cmds)
+
+    lsf.depth = 0
+    runner.run(cmds)
+    assert lsf.ran
+
+
+class PendingRunner(FakeRunner):
+    """Submit-and-return backend whose jobs stay pending forever."""
+
+    def queue_depth(self):
+        return len(self.ran)
+
+
+def test_submit_and_return_does_not_take_everything():
+    cmds = [f"cmd{i}" for i in range(200)]
+    lsf = PendingRunner("lsf", blocking=False)
+    local = FakeRunner("local", delay=0.0005)
+    runner = HybridRunner("test", [lsf, local], poll_interval=0.01)
+    runner.run(cmds)
+    assert len(lsf.ran) == 100
+    assert len(local.ran) == 100
+
+    lsf.ran, local.ran = [], []
+    runner = HybridRunner("test", [lsf, local], max_queue_depth=10, poll_interval=0.01)
+    runner.run(cmds)
+    assert len(lsf.ran) == 10
+    assert len(local.ran) == 190
+
+
+def peak_concurrency(stamp_dir):
+    """Return the maximum number of commands that ran at the same time."""
+    events = []
+    for path in stamp_dir.iterdir():
+        start, end = map(float, path.read_text().split())
+        events += [(start, 1), (end, -1)]
+    running, peak = 0, 0
+    for _, change in sorted(events):
+        running += change
+        peak = max(peak, running)
+    return peak
+
+
+def test_local_workers_run_concurrently(tmp_path):
+    cmds = [
+        f"(date +%s.%N; sleep 0.5; date +%s.%N) > {tmp_path}/{i}" for i in range(8)
+    ]
+    local = SingleRunner("local")
+    local.num_workers = 8  # Independent of the CPUs of the testing machine.
+    local.dispatch_delay = 0
+    runner = HybridRunner("test", [local], chunk_size=1)
+    start = time.time()
+    runner.run(cmds)
+    assert time.time() - start < 2.0
+    assert peak_concurrency(tmp_path) == 8
+
+
+def test_ibm_submit_names(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("os.system", lambda cmd: 0)
+    runner = IBMRunner("exp")
+    first = runner.submit(["a", "b"], [0, 1])
+    second = runner.submit(["c"], [2])
+    assert '-J "exp-0"' in first[0]
+    assert '-J "exp-1"' in first[1]
+    assert '-J "exp-2"' in second[0]
+
+
+def test_failed_backend(cmds):
+    broken, local = FakeRunner("broken", fail=True), FakeRunner("local", delay=0.001)
+    runner = HybridRunner("test", [broken, local])
+    runner.run(cmds)
+    assert sorted(local.ran) == sorted(cmds)
+
+    with pytest.raises(RuntimeError):
+        HybridRunner("test", [broken]).run(cmds)
+
+
+def test_init_overflow():
+    runner = init_runner("test", overflow=True)
+    assert isinstance(runner, HybridRunner)
+    assert runner.max_queue_depth == 100
+    assert isinstance(runner.runners[0], SingleRunner)
@@ -0,0 +1,71 @@
+import pytest
+
+from lsf_runner.placement import PlacementEngine
+
+
+@pytest.fixture()
+def engine():
+    engine_ = PlacementEngine(["fast", "slow"], num_threads=1)
+    engine_.record_duration("fast", 1.0)
+    engine_.record_duration("slow", 4.0)
+    return engine_
+
+
+def test_capacity():
+    engine = PlacementEngine(["a"], num_threads=2, memory=1000)
+    engine.update("a", free_cpu=10, free_memory=None)
+    assert engine.capacity("a") == 4
+    engine.update("a", free_cpu=10, free_memory=2500)
+    assert engine.capacity("a") == 2
+    engine.update("a", free_cpu=2, free_memory=2500)
+    assert engine.capacity("a") == 0
+
+
+def test_plan_proportional_to_speed(engine):
+    engine.plan([str(i) for i in range(10)])
+    assert len(engine.queues["fast"]) == 8
+    assert len(engine.queues["slow"]) == 2
+
+
+def test_failures_lower_score(engine):
+    for _ in range(5):
+        engine.record_result("fast", False)
+        engine.record_result("fast", True)
+    assert engine.score("fast") == pytest.approx(0.5)
+    assert engine.score("slow") == pytest.approx(0.25)
+
+
+def test_dispatch_all_hosts_in_one_pass(engine):
+    engine.update("fast", free_cpu=5)
+    engine.update("slow", free_cpu=4)
+    engine.plan([str(i) for i in range(10)])
+    dispatch = engine.dispatch()
+    hosts = [host for host, _ in dispatch]
+    assert hosts.count("fast") == 3
+    assert hosts.count("slow") == 2
+    assert engine.pending == 5
+    assert engine.dispatch() == []
+
+
+def test_rebalance_moves_unstarted_work(engine):
+    engine.update("fast", free_cpu=2)
+    engine.update("slow", free_cpu=2)
+    engine.plan([str(i) for i in range(10)])
+    assert engine.dispatch() == []
+
+    engine.update("fast", free_cpu=12)
+    dispatch = engine.dispatch()
+    assert len(dispatch) == 10
+    assert all(host == "fast" for host, _ in dispatch)
+    assert engine.pending == 0
+
+
+def test_requeue(engine):
+    engine.requeue("slow", "cmd")
+    assert engine.queues["slow"] == ["cmd"]
+
+
+def test_unknown_memory():
+    engine = PlacementEngine(["a"], num_threads=1, memory=1000)
+    engine.update("a", free_cpu=5, free_memory=None)
+    assert engine.capacity("a") == 3
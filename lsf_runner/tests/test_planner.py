@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from lsf_runner import HybridRunner, IBMRunner, SingleRunner, load_runtimes
+from lsf_runner.planner import BackendPlan, estimate_plan
+
+
+@pytest.fixture()
+def cmds():
+    return [f"cmd{i}" for i in range(10)]
+
+
+def test_estimate_plan(cmds):
+    runtimes = {cmd: 3600.0 for cmd in cmds[:5]}
+    plan = estimate_plan(
+        cmds + cmds[:1],
+        [BackendPlan("local", 2, num_threads=2, memory=1000)],
+        runtimes=runtimes,
+    )
+    assert plan.num_commands == 11
+    assert plan.duplicates == ["cmd0"]
+    assert plan.core_hours == pytest.approx(22.0)
+    assert plan.makespan == pytest.approx(6 * 3600)
+    assert plan.backends[0].num_commands == 11
+    assert plan.peak_memory == 2000
+    assert plan.num_unknown_runtime == 0
+
+
+def test_dispatch_delay(cmds):
+    plan = estimate_plan(cmds, [BackendPlan("local", 10, 1.0)], default_runtime=5)
+    assert plan.makespan == pytest.approx(9 + 5)
+
+
+def test_unknown_runtime(cmds):
+    plan = estimate_plan(cmds, [BackendPlan("local", 1)])
+    assert plan.num_unknown_runtime == len(cmds)
+    assert plan.core_hours == 0
+    assert "WARNING" in str(plan)
+
+
+def test_ibm_plan(cmds):
+    runner = IBMRunner("test", num_threads=4, wall_time=60, memory=100)
+    runner.max_array_size = 4
+    plan = runner.plan(cmds, runtimes={"cmd0": 7200}, default_runtime=600)
+
+    assert plan.array_chunks == [(1, 4), (5, 8), (9, 10)]
+    assert plan.over_wall_time == ["cmd0"]
+    assert plan.backends[0].num_workers == len(cmds)
+    assert plan.makespan == pytest.approx(7200)
+    assert plan.core_hours == pytest.approx(4 * (2 + 9 * 600 / 3600))
+
+
+def test_ibm_run_batch_arrays(cmds, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("os.system", lambda cmd: 0)
+    runner = IBMRunner("exp")
+    runner.max_array_size = 4
+    bsub_cmds = runner.run_batch(cmds).splitlines()
+
+    chunks = runner.plan(cmds, default_runtime=60).array_chunks
+    assert len(bsub_cmds) == len(chunks) == 3
+    for bsub_cmd, (first, last) in zip(bsub_cmds, chunks):
+        assert f'-J "exp[1-{last - first + 1}]"' in bsub_cmd
+        assert f"NR==jindex+{first - 1}'" in bsub_cmd
+
+
+def test_multi_machine_plan(cmds):
+    pytest.importorskip("paramiko")
+    from lsf_runner.multi_machine_runner import MultiMachineRunner
+
+    hosts = ["a", "b"]
+    runner = MultiMachineRunner("test", "user", "pass", hosts, num_threads=2)
+    with pytest.warns(UserWarning):
+        assert runner.plan(cmds).backends[0].num_workers == 2
+
+    runner.cpus_per_host = 10
+    assert runner.plan(cmds).backends[0].num_workers == 2 * (10 - 2) // 2
+
+
+def test_hybrid_plan(cmds):
+    runner = HybridRunner("test", [IBMRunner("lsf"), SingleRunner("local")])
+    plan = runner.plan(cmds, default_runtime=60)
+    assert [b.name for b in plan.backends] == ["IBMRunner", "SingleRunner"]
+    assert sum(b.num_commands for b in plan.backends) == len(cmds)
+
+
+def test_hybrid_plan_per_backend():
+    cmds = [f"cmd{i}" for i in range(50)]
+    lsf = IBMRunner("lsf", memory=1000, wall_time=1)
+    lsf.max_array_size = 4
+    runner = HybridRunner("test", [lsf, SingleRunner("local")], max_queue_depth=5)
+    plan = runner.plan(cmds, runtimes={"cmd0": 120}, default_runtime=30)
+
+    ibm, local = plan.backends
+    assert ibm.num_workers == 5
+    assert ibm.num_commands > 0 and local.num_commands > 0
+    assert plan.peak_memory == 5000
+    assert plan.over_wall_time == ["cmd0"]
+    assert plan.array_chunks == ibm.array_chunks
+    assert ibm.array_chunks[0] == (1, 4)
+
+
+def test_load_runtimes(tmp_path):
+    path = tmp_path / "runtimes.json"
+    path.write_text(json.dumps({"cmd0": 10}))
+    assert load_runtimes(str(path)) == {"cmd0": 10.0}
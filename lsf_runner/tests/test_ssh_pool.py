@@ -0,0 +1,160 @@
+import socket
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("paramiko")
+
+from lsf_runner.multi_machine_runner import MultiMachineRunner  # noqa: E402
+from lsf_runner.ssh_pool import (  # noqa: E402
+    SSHChannelLimitError,
+    SSHConnectionError,
+    SSHConnectionPool,
+)
+
+
+class FakeTransport(object):
+    def __init__(self):
+        self.active = True
+        self.keepalive = 0
+
+    def is_active(self):
+        return self.active
+
+    def send_ignore(self):
+        pass
+
+    def set_keepalive(self, interval):
+        self.keepalive = interval
+
+
+class FakeChannel(object):
+    """Channel of a shell that exits at once, like sshd sees `cmd &'.
+
+    The session stays open while a background job holds the output, that is, unless
+    the job redirects it.
+    """
+
+    def __init__(self, command):
+        self.closed = False
+        self.eof_received = "> /dev/null 2>&1" in command or not command.endswith("&")
+
+    def exit_status_ready(self):
+        return True
+
+
+class FakeStdout(object):
+    def __init__(self, command):
+        self.channel = FakeChannel(command)
+
+    def readlines(self):
+        return []
+
+
+class FakeClient(object):
+    reachable = True
+    delay = {}
+
+    def __init__(self):
+        self.transport = None
+
+    def load_system_host_keys(self):
+        pass
+
+    def connect(self, hostname, username, password, timeout):
+        time.sleep(self.delay.get(hostname, 0))
+        if not self.reachable:
+            raise socket.timeout("unreachable")
+        self.transport = FakeTransport()
+
+    def exec_command(self, command, timeout=None):
+        return None, FakeStdout(command), None
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.active = False
+
+
+@pytest.fixture()
+def pool():
+    FakeClient.reachable = True
+    pool_ = SSHConnectionPool("user", "pass", client_factory=FakeClient)
+    yield pool_
+    pool_.close()
+
+
+def test_reuse(pool):
+    ssh = pool.get("host")
+    assert ssh.get_transport().keepalive == pool.keepalive
+    assert pool.get("host") is ssh
+    pool.exec_command("host", "ls")
+    assert pool.stats["connects"] == 1
+    assert pool.stats["reuses"] == 2
+    assert pool.reuse_ratio == pytest.approx(2 / 3)
+
+
+def test_reconnect_unhealthy(pool):
+    ssh = pool.get("host")
+    ssh.get_transport().active = False
+    assert pool.get("host") is not ssh
+    assert pool.stats["reconnects"] == 1
+    assert pool.stats["connects"] == 2
+
+
+def test_backoff(pool):
+    FakeClient.reachable = False
+    with pytest.raises(SSHConnectionError):
+        pool.get("host")
+    FakeClient.reachable = True
+    with pytest.raises(SSHConnectionError, match="backing off"):
+        pool.get("host")
+    assert pool.stats["failures"] == 1
+
+    pool._retry_at["host"] = 0.0
+    assert pool.get("host") is not None
+
+
+def test_bounded_channels():
+    pool = SSHConnectionPool("user", "pass", max_channels=2, client_factory=FakeClient)
+    _, out, _ = pool.exec_command("host", "sleep 100 &")
+    pool.exec_command("host", "sleep 100 &")
+    assert pool.open_channels("host") == 2
+    with pytest.raises(SSHChannelLimitError):
+        pool.exec_command("host", "ls")
+
+    out.channel.eof_received = True  # The background job finished.
+    pool.exec_command("host", "ls")
+    assert pool.open_channels("host") == 1
+
+
+def test_runner_detaches_commands():
+    pool = SSHConnectionPool("user", "pass", max_channels=2, client_factory=FakeClient)
+    runner = MultiMachineRunner("test", "user", "pass", ["host"], pool=pool)
+    for _ in range(10):
+        assert runner._run_at_machine("host", "sleep 100; echo done") == 0
+    assert pool.open_channels("host") == 0
+
+
+def test_slow_host_does_not_block_others(pool):
+    FakeClient.delay = {"slow": 0.5}
+    thread = threading.Thread(target=pool.get, args=("slow",))
+    thread.start()
+    time.sleep(0.05)
+    start = time.time()
+    pool.get("fast")
+    assert time.time() - start < 0.25
+    thread.join()
+    FakeClient.delay = {}
+
+
+def test_runner_aborts_when_unreachable():
+    FakeClient.reachable = False
+    pool = SSHConnectionPool("user", "pass", client_factory=FakeClient)
+    runner = MultiMachineRunner("test", "user", "pass", ["a", "b"], pool=pool)
+    with pytest.warns(UserWarning), pytest.raises(SSHConnectionError):
+        runner.run(["ls"])
+    FakeClient.reachable = True